@@ -1,12 +1,30 @@
-from fastapi import FastAPI, HTTPException
+import os
+
+# One BLAS/torch thread per process: uvicorn workers provide the
+# parallelism, so letting each worker spawn a full thread pool only
+# causes oversubscription. OpenBLAS sizes its pool when numpy (or
+# anything importing it) first loads, so this must precede every other
+# import.
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
+from collections import OrderedDict
+import asyncio
+import re
 import uvicorn
-import requests
-from bs4 import BeautifulSoup
+import httpx
+import hnswlib
+import numpy as np
+from selectolax.parser import HTMLParser
+from cachetools import TTLCache
 import logging
+import torch
+
+torch.set_num_threads(1)
 
 # Internal modules
 from scrapper import SHLScraper
@@ -18,7 +36,9 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # -------------------- Initialize FastAPI App -------------------- #
-app = FastAPI(title="SHL Assessment Recommender API")
+app = FastAPI(
+    title="SHL Assessment Recommender API", default_response_class=ORJSONResponse
+)
 
 # -------------------- CORS Middleware -------------------- #
 origins = ["http://localhost:5500", "http://127.0.0.1:5500"]
@@ -51,41 +71,169 @@ class RecommendResponse(BaseModel):
     recommendations: List[AssessmentResponse]
 
 
+# -------------------- Semantic Query Cache -------------------- #
+# Cosine similarity a new query must reach against a cached one to reuse
+# its recommendations (configurable via env var).
+CACHE_SIMILARITY_THRESHOLD = float(os.environ.get("CACHE_SIMILARITY_THRESHOLD", "0.95"))
+CACHE_CAPACITY = 10000
+
+
+class SemanticCache:
+    """Bounded similarity cache for /recommend results, keyed by query embedding.
+
+    Near-duplicate queries (cosine similarity >= threshold against a cached
+    query vector) reuse the cached recommendation list instead of re-running
+    the full embedding search. A hit also requires the extracted constraints
+    to match, so "Java test under 30 minutes" never serves results filtered
+    for "under 45 minutes" just because the embeddings are close. Eviction
+    is LRU once capacity is reached.
+    """
+
+    def __init__(
+        self,
+        dim: int = 384,
+        capacity: int = CACHE_CAPACITY,
+        threshold: float = CACHE_SIMILARITY_THRESHOLD,
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.index = hnswlib.Index(space="cosine", dim=dim)
+        self.index.init_index(
+            max_elements=capacity, ef_construction=200, M=16, allow_replace_deleted=True
+        )
+        self.payloads = {}  # label -> (constraints, recommendation list)
+        self.lru = OrderedDict()  # labels ordered LRU -> MRU
+        self.next_id = 0
+
+    def get(self, query_vec: np.ndarray, constraints: dict):
+        """Return the cached recommendations for a near-duplicate query, or None.
+
+        Requires both embedding similarity and identical extracted
+        constraints, mirroring the QueryProcessor cache's guard.
+        """
+        if not self.payloads:
+            return None
+        labels, distances = self.index.knn_query(query_vec, k=1)
+        label, distance = int(labels[0][0]), float(distances[0][0])
+        if distance <= 1.0 - self.threshold and label in self.payloads:
+            cached_constraints, recommendations = self.payloads[label]
+            if cached_constraints == constraints:
+                self.lru.move_to_end(label)
+                return recommendations
+        return None
+
+    def put(self, query_vec: np.ndarray, constraints: dict, recommendations: list):
+        """Insert a query vector and its recommendations, evicting the LRU entry if full."""
+        if len(self.payloads) >= self.capacity:
+            oldest, _ = self.lru.popitem(last=False)
+            self.payloads.pop(oldest, None)
+            self.index.mark_deleted(oldest)
+        label = self.next_id
+        self.next_id += 1
+        self.index.add_items(
+            query_vec.reshape(1, -1), [label], replace_deleted=True
+        )
+        self.payloads[label] = (constraints, recommendations)
+        self.lru[label] = None
+
+
 # -------------------- Initialize Core Components -------------------- #
 scraper = SHLScraper()
 embedding_engine = EmbeddingEngine()
 query_processor = QueryProcessor(embedding_engine)
+semantic_cache = SemanticCache()
+
+# Shared headers for outbound URL fetches (built once, not per call)
+FETCH_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+# Pooled HTTP client, created on startup so keep-alive connections are
+# reused across /recommend calls instead of paying a TCP+TLS handshake each time.
+http_client: Optional[httpx.AsyncClient] = None
 
 
 # -------------------- Startup Event -------------------- #
 @app.on_event("startup")
 async def startup_event():
+    global http_client
     logger.info("Loading data and generating embeddings...")
     try:
+        http_client = httpx.AsyncClient(
+            http2=True,
+            # httpx doesn't follow redirects by default (requests did), and
+            # job-posting URLs commonly redirect (http->https, trackers)
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            timeout=10.0,
+        )
         assessments = scraper.load_data()
         embedding_engine.process_assessments(assessments)
+
+        # Warmup query: pages in the HNSW graph and initializes the encoder
+        # kernels so the first real /recommend call doesn't pay the
+        # cold-start cost.
+        embedding_engine.search("warmup", n_results=10)
         logger.info("System initialized successfully.")
     except Exception as e:
         logger.exception(f"Startup error: {e}")
         raise RuntimeError(f"Failed during startup: {e}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if http_client is not None:
+        await http_client.aclose()
+
+
 # -------------------- Utility: Extract Text From URL -------------------- #
-def extract_text_from_url(url: str) -> str:
-    try:
-        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+# Reject oversized pages so a single huge document can't stall a worker
+MAX_HTML_BYTES = 2 * 1024 * 1024
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        for tag in soup(["script", "style"]):
-            tag.extract()
+# Collapses trailing/leading whitespace around newlines and runs of blank
+# lines in one C-level pass over the extracted text
+_WS_RE = re.compile(r"[ \t]*\n\s*")
 
-        raw_text = soup.get_text(separator="\n")
-        cleaned_text = "\n".join(
-            line.strip() for line in raw_text.splitlines() if line.strip()
-        )
-        return cleaned_text[:1500] + "..." if len(cleaned_text) > 1500 else cleaned_text
+
+# Cleaned page text per URL: recruiters typically issue several queries
+# against the same job posting, so repeats skip the fetch and parse entirely
+_url_cache = TTLCache(maxsize=512, ttl=600)
+_url_lock = asyncio.Lock()
+
+
+def _parse_html(html: str) -> str:
+    """Strip scripts/styles and return the cleaned page text (CPU-bound)."""
+    tree = HTMLParser(html)
+    for tag in tree.css("script, style"):
+        tag.decompose()
+
+    raw_text = tree.body.text(separator="\n") if tree.body else ""
+    return _WS_RE.sub("\n", raw_text).strip()
+
+
+async def _fetch_and_parse(url: str) -> str:
+    response = await http_client.get(url, headers=FETCH_HEADERS)
+    response.raise_for_status()
+
+    if len(response.content) > MAX_HTML_BYTES:
+        raise ValueError("Page too large to parse (>2 MB)")
+
+    # HTML parsing is CPU-bound; run it off the event loop.
+    cleaned_text = await asyncio.to_thread(_parse_html, response.text)
+    return cleaned_text[:1500] + "..." if len(cleaned_text) > 1500 else cleaned_text
+
+
+async def extract_text_from_url(url: str) -> str:
+    try:
+        if url in _url_cache:
+            return _url_cache[url]
+
+        async with _url_lock:
+            # Re-check inside the lock so N concurrent requests for the same
+            # URL trigger exactly one fetch.
+            if url in _url_cache:
+                return _url_cache[url]
+            text = await _fetch_and_parse(url)
+            _url_cache[url] = text
+            return text
 
     except Exception as e:
         logger.error(f"URL extraction failed: {e}")
@@ -93,19 +241,30 @@ def extract_text_from_url(url: str) -> str:
 
 
 # -------------- Health Check Endpoint --------------- #
-@app.get("/health", response_class=JSONResponse)
+# Load balancers poll this constantly; serve one pre-serialized response
+# instead of re-encoding the same payload on every probe.
+_HEALTH_RESPONSE = Response(
+    content=b'{"status":"ok","message":"API is live"}',
+    media_type="application/json",
+)
+
+
+@app.get("/health", include_in_schema=False)
 async def health_check():
-    return {"status": "ok", "message": "API is live"}
+    return _HEALTH_RESPONSE
 
 
 # -------------- Recommendation Endpoint --------- #
-@app.post("/recommend", response_model=RecommendResponse)
+# response_model is deliberately omitted: the recommendations are already
+# plain dicts with known keys, so we serialize them directly with orjson and
+# keep the Pydantic models only for the OpenAPI schema.
+@app.post("/recommend", responses={200: {"model": RecommendResponse}})
 async def recommend_assessments(request: QueryRequest):
     query_text = request.query.strip()
 
     # Append job description text from URL if provided
     if request.url:
-        url_text = extract_text_from_url(request.url)
+        url_text = await extract_text_from_url(request.url)
         query_text = f"{query_text} {url_text}" if query_text else url_text
 
     if not query_text or len(query_text) < 3:
@@ -114,7 +273,21 @@ async def recommend_assessments(request: QueryRequest):
         )
 
     try:
-        recommendations = query_processor.process_query(query_text, max_results=10)
+        # Embed once; the same vector serves the cache lookup and, on a miss,
+        # the downstream ANN search. MiniLM inference and the search are
+        # CPU-bound, so both run off the event loop.
+        query_vec = await asyncio.to_thread(embedding_engine.embed_query, query_text)
+
+        # Constraints are regex-only and cheap; extracting them up front lets
+        # the cache refuse hits whose hard filters differ from this query's.
+        constraints = query_processor.extract_constraints(query_text)
+
+        recommendations = semantic_cache.get(query_vec, constraints)
+        if recommendations is None:
+            recommendations = await asyncio.to_thread(
+                query_processor.process_query, query_text, 10, query_vec
+            )
+            semantic_cache.put(query_vec, constraints, recommendations)
 
         # if not recommendations:
         #     raise HTTPException(
@@ -125,19 +298,21 @@ async def recommend_assessments(request: QueryRequest):
                 status_code=404, content={"detail": "No relevant assessments found"}
             )
 
-        response = [
-            AssessmentResponse(
-                name=rec.get("name", "Unknown"),
-                url=rec.get("url", "#"),
-                remote_testing=rec.get("remote_testing", "Unknown"),
-                adaptive_irt=rec.get("adaptive_irt", "Unknown"),
-                duration=rec.get("duration", "Unknown"),
-                test_type=rec.get("test_type", "Unknown"),
-            )
-            for rec in recommendations
-        ]
-
-        return RecommendResponse(recommendations=response)
+        return ORJSONResponse(
+            {
+                "recommendations": [
+                    {
+                        "name": rec.get("name", "Unknown"),
+                        "url": rec.get("url", "#"),
+                        "remote_testing": rec.get("remote_testing", "Unknown"),
+                        "adaptive_irt": rec.get("adaptive_irt", "Unknown"),
+                        "duration": rec.get("duration", "Unknown"),
+                        "test_type": rec.get("test_type", "Unknown"),
+                    }
+                    for rec in recommendations
+                ]
+            }
+        )
 
     except Exception as e:
         logger.exception(f"Error during recommendation: {e}")
@@ -145,4 +320,6 @@ async def recommend_assessments(request: QueryRequest):
 
 
 if __name__ == "__main__":
-    uvicorn.run("api:app", host="0.0.0.0", port=8501, reload=True)
+    uvicorn.run(
+        "api:app", host="0.0.0.0", port=8501, workers=max(2, os.cpu_count() // 2)
+    )
@@ -14,10 +14,24 @@ st.set_page_config(
 )
 
 
+@st.cache_resource
+def get_client() -> httpx.Client:
+    """Return a pooled HTTP client shared across Streamlit reruns.
+
+    cache_resource keeps the client (and its keep-alive connection to the
+    API) alive between reruns, so repeated searches skip the TCP+TLS setup.
+    """
+    return httpx.Client(
+        http2=True,
+        timeout=httpx.Timeout(10.0, connect=2.0),
+        limits=httpx.Limits(max_keepalive_connections=4),
+    )
+
+
 def check_api_health():
     """Check if the API is running."""
     try:
-        response = httpx.get(f"{API_URL}/health", timeout=5)
+        response = get_client().get(f"{API_URL}/health", timeout=5)
         if response.status_code == 200:
             return True
         else:
@@ -38,7 +52,7 @@ def get_recommendations(query: str, url: str = None):
         "Content-Type": "application/json",
     }
     try:
-        response = httpx.post(
+        response = get_client().post(
             f"{API_URL}/recommend",
             json={"query": query, "url": url},
             headers=headers,
@@ -63,8 +77,18 @@ def display_recommendations(recommendations: List[Dict[str, Any]]):
     if not recommendations:
         return
 
-    # Convert to DataFrame for easier display
-    df = pd.DataFrame(recommendations)
+    # Fixed column list so pandas skips dtype inference
+    df = pd.DataFrame.from_records(
+        recommendations,
+        columns=[
+            "name",
+            "url",
+            "remote_testing",
+            "adaptive_irt",
+            "duration",
+            "test_type",
+        ],
+    )
 
     # Rename columns for better display
     df = df.rename(
@@ -78,11 +102,12 @@ def display_recommendations(recommendations: List[Dict[str, Any]]):
         }
     )
 
-    # Make URLs clickable
-    df["URL"] = df["URL"].apply(lambda x: f'<a href="{x}" target="_blank">{x}</a>')
-
-    # Display table with HTML
-    st.write(df.to_html(escape=False, index=False), unsafe_allow_html=True)
+    # Native table rendering with clickable URLs — no per-row HTML formatting
+    st.dataframe(
+        df,
+        use_container_width=True,
+        column_config={"URL": st.column_config.LinkColumn()},
+    )
 
 
 def main():
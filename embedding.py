@@ -1,27 +1,152 @@
 from sentence_transformers import SentenceTransformer
-import chromadb
+import hnswlib
+import numpy as np
+import json
+import os
+import xxhash
 from typing import List, Dict, Any
 
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_DIR = "data/models/minilm-int8"
+ONNX_MODEL_FILE = "model_quantized.onnx"
 
-class EmbeddingEngine:
-    def __init__(self):
-        """Initialize the Embedding Engine with model and database configuration."""
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-        self.db_path = "data/chroma_db"
-        self.collection_name = "shl_assessments"
-        self.client = chromadb.PersistentClient(path=self.db_path)
+EMBEDDING_DIM = 384
+INDEX_MAX_ELEMENTS = 10000
 
-        # Create collection if it doesn't exist
-        self._initialize_collection()
 
-    def _initialize_collection(self):
-        """Load or create the collection."""
+class EmbeddingEngine:
+    def __init__(self):
+        """Initialize the Embedding Engine with model and index configuration."""
+        self._initialize_encoder()
+        self.db_path = "data/vector_index"
+        os.makedirs(self.db_path, exist_ok=True)
+        self.index_path = os.path.join(self.db_path, "index.bin")
+        self.meta_path = os.path.join(self.db_path, "metadata.json")
+
+        # {id: content hash} manifest so re-processing only embeds
+        # assessments whose document text actually changed.
+        self.manifest_path = os.path.join(self.db_path, "manifest.json")
+
+        # In-process HNSW index plus a parallel metadata list indexed by the
+        # same integer labels. A query is a single C call into hnswlib with
+        # no SQLite or client-layer plumbing in between.
+        self._initialize_index()
+
+    def _initialize_encoder(self):
+        """Load the int8 ONNX Runtime encoder, falling back to PyTorch.
+
+        MiniLM under ONNX Runtime with dynamic int8 quantization runs 2-4x
+        faster than PyTorch fp32 on CPU; the quantized model is exported on
+        first run and cached under data/models.
+        """
+        self.session = None
+        self.tokenizer = None
+        self.model = None
         try:
-            self.collection = self.client.get_collection(self.collection_name)
-            print(f"Loaded existing collection with {self.collection.count()} items")
+            import onnxruntime
+            from transformers import AutoTokenizer
+
+            onnx_path = os.path.join(ONNX_MODEL_DIR, ONNX_MODEL_FILE)
+            if not os.path.exists(onnx_path):
+                self._export_quantized_onnx()
+
+            so = onnxruntime.SessionOptions()
+            # One intra-op thread per process; uvicorn workers parallelize
+            so.intra_op_num_threads = 1
+            self.session = onnxruntime.InferenceSession(
+                onnx_path, providers=["CPUExecutionProvider"], sess_options=so
+            )
+            self.tokenizer = AutoTokenizer.from_pretrained(ONNX_MODEL_DIR)
+            print("Using int8 ONNX Runtime encoder")
         except Exception as e:
-            self.collection = self.client.create_collection(self.collection_name)
-            print(f"Created new collection due to error: {e}")
+            print(f"ONNX encoder unavailable ({e}), falling back to PyTorch")
+            self.model = SentenceTransformer("all-MiniLM-L6-v2")
+
+    def _export_quantized_onnx(self):
+        """Export MiniLM to ONNX and apply dynamic int8 quantization (one-shot)."""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        print("Exporting quantized ONNX model (first run only)...")
+        os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+
+        model = ORTModelForFeatureExtraction.from_pretrained(MODEL_NAME, export=True)
+        model.save_pretrained(ONNX_MODEL_DIR)
+        AutoTokenizer.from_pretrained(MODEL_NAME).save_pretrained(ONNX_MODEL_DIR)
+
+        quantizer = ORTQuantizer.from_pretrained(ONNX_MODEL_DIR)
+        quantizer.quantize(
+            save_dir=ONNX_MODEL_DIR,
+            quantization_config=AutoQuantizationConfig.avx2(is_static=False),
+        )
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Embed texts into normalized fp32 vectors via ONNX Runtime or PyTorch."""
+        if self.session is None:
+            return self.model.encode(
+                texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            ).astype(np.float32)
+
+        input_names = {inp.name for inp in self.session.get_inputs()}
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start : start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=256,
+                return_tensors="np",
+            )
+            feeds = {
+                name: encoded[name].astype(np.int64)
+                for name in input_names
+                if name in encoded
+            }
+            hidden = self.session.run(None, feeds)[0]
+
+            # Mean-pool over real tokens, matching sentence-transformers
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            batches.append((hidden * mask).sum(axis=1) / mask.sum(axis=1).clip(1e-9))
+
+        embeddings = np.concatenate(batches, axis=0).astype(np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True).clip(1e-12)
+        return embeddings / norms
+
+    def _initialize_index(self):
+        """Load the persisted HNSW index and metadata, or start empty."""
+        self.index = hnswlib.Index(space="ip", dim=EMBEDDING_DIM)
+        self.meta: List[Dict[str, Any]] = []
+
+        if os.path.exists(self.index_path) and os.path.exists(self.meta_path):
+            try:
+                self.index.load_index(
+                    self.index_path, max_elements=INDEX_MAX_ELEMENTS
+                )
+                with open(self.meta_path, "r", encoding="utf-8") as f:
+                    self.meta = json.load(f)
+                print(f"Loaded existing index with {len(self.meta)} items")
+                return
+            except Exception as e:
+                print(f"Failed to load index ({e}), starting a new one")
+
+        self.index.init_index(
+            max_elements=INDEX_MAX_ELEMENTS, ef_construction=200, M=16
+        )
+
+        # A fresh index must not inherit the manifest from a previous one:
+        # a stale manifest would make process_assessments skip every document
+        # and leave the index permanently empty.
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Encode a query into a normalized embedding vector."""
+        return self.encode([query])[0]
 
     def create_document_text(self, assessment: Dict[str, Any]) -> str:
         """Create a searchable text representation of an assessment."""
@@ -33,61 +158,82 @@ class EmbeddingEngine:
         return f"{name}. {description} Type: {test_type}. Duration: {duration}."
 
     def process_assessments(self, assessments: List[Dict[str, Any]]):
-        """Process assessments, generate embeddings, and store them in the vector database."""
+        """Process assessments, generate embeddings, and store them in the index."""
 
         if not assessments:
             print("No assessments provided. Skipping processing.")
             return
 
-        if self.collection.count() > 0:
-            print(
-                "Collection already contains documents, skipping embedding generation."
-            )
-            return
-
-        print("Processing assessments and generating embeddings...")
-
-        # Prepare data for insertion
-        ids = [str(i) for i in range(len(assessments))]
-
         # Generate document text from assessments
         documents = [
             self.create_document_text(assessment) for assessment in assessments
         ]
-        metadatas = assessments  # Store the full assessment data as metadata
 
-        # Debug: Check if all lists are populated correctly
-        print(f"Documents: {documents}")
-        print(f"IDs: {ids}")
-        print(f"Metadatas: {metadatas}")
+        # Compare content hashes against the persisted manifest so only new
+        # or changed assessments are re-embedded (e.g. after a re-scrape).
+        hashes = [xxhash.xxh64(doc).hexdigest() for doc in documents]
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
 
-        # Check if any of the lists are empty
-        if not documents or not ids or not metadatas:
-            print(
-                "Error: One or more lists (documents, ids, metadatas) are empty. Skipping insertion."
-            )
+        changed = [
+            i for i, h in enumerate(hashes) if manifest.get(str(i)) != h
+        ]
+
+        # Keep the metadata list aligned with the integer index labels
+        if len(self.meta) < len(assessments):
+            self.meta.extend([None] * (len(assessments) - len(self.meta)))
+        for i, assessment in enumerate(assessments):
+            self.meta[i] = assessment
+
+        if not changed:
+            print("All assessment embeddings are up to date, skipping generation.")
             return
 
-        # Insert data into the collection
+        print(f"Processing {len(changed)} new or changed assessments...")
+
+        # Embed the changed documents in one batched call
+        embeddings = self.encode([documents[i] for i in changed])
+
+        # Insert (or replace) the changed labels and persist everything
         try:
-            self.collection.add(documents=documents, ids=ids, metadatas=metadatas)
-            print(f"Generated embeddings for {len(assessments)} assessments.")
+            self.index.add_items(
+                embeddings,
+                np.array(changed, dtype=np.int64),
+            )
+            self.index.save_index(self.index_path)
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump(self.meta, f)
+            print(f"Generated embeddings for {len(changed)} assessments.")
+
+            for i in changed:
+                manifest[str(i)] = hashes[i]
+            with open(self.manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
         except Exception as e:
-            print(f"Error occurred while adding documents to the collection: {e}")
+            print(f"Error occurred while adding documents to the index: {e}")
+
+    def search(
+        self, query: str, n_results: int = 10, query_vec: np.ndarray = None
+    ) -> List[Dict[str, Any]]:
+        """Search for relevant assessments based on a query.
 
-    def search(self, query: str, n_results: int = 10) -> List[Dict[str, Any]]:
-        """Search for relevant assessments based on a query."""
+        If query_vec is provided (an already-normalized embedding of the query),
+        it is used directly so the query is not embedded a second time.
+        """
         try:
-            results = self.collection.query(query_texts=[query], n_results=n_results)
-
-            # Process results
-            if results and "metadatas" in results and results["metadatas"]:
-                return results["metadatas"][
-                    0
-                ]  # Return the first element since it's a single query
-            else:
+            if not self.meta:
                 print("No matching results found.")
                 return []
+
+            if query_vec is None:
+                query_vec = self.embed_query(query)
+
+            labels, _ = self.index.knn_query(
+                query_vec.astype(np.float32), k=min(n_results, len(self.meta))
+            )
+            return [self.meta[i] for i in labels[0]]
         except Exception as e:
             print(f"Error during search: {e}")
             return []
@@ -2,8 +2,44 @@
 import json
 import pandas as pd
 import numpy as np
+import numba
 from typing import List, Dict, Any
 
+# Precomputed 1/log2(rank+2) discounts for DCG, covering ranks up to 126
+INV_LOG2 = 1.0 / np.log2(np.arange(2, 128))
+
+
+@numba.njit(cache=True)
+def _score_query(
+    pred_hashes: np.ndarray, rel_hashes_sorted: np.ndarray, k: int
+) -> tuple:
+    """Fused Recall@K, Precision@K and NDCG@K over hashed assessment names.
+
+    pred_hashes holds the hashed predicted names in rank order;
+    rel_hashes_sorted holds the sorted hashed ground-truth names so
+    membership tests are a binary search instead of a set lookup.
+    """
+    n_rel = rel_hashes_sorted.shape[0]
+    n_pred = min(k, pred_hashes.shape[0])
+
+    hits = 0
+    dcg = 0.0
+    for i in range(n_pred):
+        j = np.searchsorted(rel_hashes_sorted, pred_hashes[i])
+        if j < n_rel and rel_hashes_sorted[j] == pred_hashes[i]:
+            hits += 1
+            dcg += INV_LOG2[i]
+
+    idcg = 0.0
+    for i in range(min(k, n_rel)):
+        idcg += INV_LOG2[i]
+
+    recall = hits / n_rel if n_rel > 0 else 0.0
+    precision = hits / n_pred if n_pred > 0 else 0.0
+    ndcg = dcg / idcg if idcg > 0 else 0.0
+
+    return recall, precision, ndcg
+
 
 class EvaluationMetrics:
     def __init__(self, test_queries_path: str, groundtruth_path: str):
@@ -17,6 +53,10 @@ class EvaluationMetrics:
         self.test_queries = self.load_json(test_queries_path)
         self.groundtruth = self.load_json(groundtruth_path)
 
+        # Materialize the relevant-id sets once; the per-metric methods used
+        # to rebuild set(self.groundtruth[query_id]) on every call.
+        self.gt_sets = {qid: frozenset(ids) for qid, ids in self.groundtruth.items()}
+
     def load_json(self, path: str) -> Dict:
         """Load JSON data from file."""
         with open(path, "r") as f:
@@ -37,18 +77,17 @@ class EvaluationMetrics:
         Returns:
             Recall@K score
         """
-        if query_id not in self.groundtruth:
+        relevant_ids = self.gt_sets.get(query_id)
+        if relevant_ids is None:
             print(f"Warning: No ground truth data for query ID {query_id}")
             return 0.0
 
-        # Get relevant assessment IDs from ground truth
-        relevant_ids = set(self.groundtruth[query_id])
-
         # Get predicted assessment IDs (top K)
         predicted_ids = [pred["name"] for pred in predictions[:k]]
 
-        # Calculate recall
-        hits = len(set(predicted_ids).intersection(relevant_ids))
+        # Calculate recall: one pass against the precomputed frozenset
+        # instead of building and intersecting a throwaway set
+        hits = sum(1 for p in predicted_ids if p in relevant_ids)
         recall = hits / len(relevant_ids) if relevant_ids else 0.0
 
         return recall
@@ -67,19 +106,17 @@ class EvaluationMetrics:
         Returns:
             Precision@K score
         """
-        if query_id not in self.groundtruth:
+        relevant_ids = self.gt_sets.get(query_id)
+        if relevant_ids is None:
             print(f"Warning: No ground truth data for query ID {query_id}")
             return 0.0
 
-        # Get relevant assessment IDs from ground truth
-        relevant_ids = set(self.groundtruth[query_id])
-
         # Get predicted assessment IDs (top K)
         predicted_ids = [pred["name"] for pred in predictions[:k]]
 
-        # Calculate precision
-        hits = len(set(predicted_ids).intersection(relevant_ids))
-        precision = hits / len(predicted_ids[:k]) if predicted_ids[:k] else 0.0
+        # Calculate precision: one pass against the precomputed frozenset
+        hits = sum(1 for p in predicted_ids if p in relevant_ids)
+        precision = hits / len(predicted_ids) if predicted_ids else 0.0
 
         return precision
 
@@ -97,13 +134,11 @@ class EvaluationMetrics:
         Returns:
             NDCG@K score
         """
-        if query_id not in self.groundtruth:
+        relevant_ids = self.gt_sets.get(query_id)
+        if relevant_ids is None:
             print(f"Warning: No ground truth data for query ID {query_id}")
             return 0.0
 
-        # Get relevant assessment IDs from ground truth
-        relevant_ids = set(self.groundtruth[query_id])
-
         # Get predicted assessment IDs (top K)
         predicted_ids = [pred["name"] for pred in predictions[:k]]
 
@@ -124,6 +159,35 @@ class EvaluationMetrics:
 
         return ndcg
 
+    def score_query(
+        self, query_id: str, predictions: List[Dict[str, Any]], k_values: List[int]
+    ) -> Dict[int, tuple]:
+        """
+        Score recall, precision and NDCG for every K in one pass.
+
+        Args:
+            query_id: ID of the query
+            predictions: List of predicted assessments
+            k_values: List of K values for the metrics
+
+        Returns:
+            Dictionary mapping k to a (recall, precision, ndcg) tuple, or
+            None when the query has no ground truth data.
+        """
+        if query_id not in self.gt_sets:
+            print(f"Warning: No ground truth data for query ID {query_id}")
+            return None
+
+        # Hash names once; every K shares the same arrays
+        pred_hashes = np.array(
+            [hash(pred["name"]) for pred in predictions], dtype=np.int64
+        )
+        rel_hashes = np.sort(
+            np.array([hash(name) for name in self.gt_sets[query_id]], dtype=np.int64)
+        )
+
+        return {k: _score_query(pred_hashes, rel_hashes, k) for k in k_values}
+
     def evaluate_all_metrics(
         self, query_processor, k_values: List[int] = [1, 3, 5, 10]
     ) -> Dict[str, Dict[str, float]]:
@@ -137,35 +201,30 @@ class EvaluationMetrics:
         Returns:
             Dictionary of metrics
         """
-        results = {
-            "recall": {k: [] for k in k_values},
-            "precision": {k: [] for k in k_values},
-            "ndcg": {k: [] for k in k_values},
-        }
-
-        for query_id, query_text in self.test_queries.items():
+        # Preallocated (queries x k_values) score matrices; a single mean
+        # reduction per metric replaces the per-k list appends and np.mean calls
+        n_q, n_k = len(self.test_queries), len(k_values)
+        recall = np.empty((n_q, n_k), np.float32)
+        precision = np.empty_like(recall)
+        ndcg = np.empty_like(recall)
+
+        max_k = max(k_values)
+        for qi, (query_id, query_text) in enumerate(self.test_queries.items()):
             # Process query
-            predictions = query_processor.process_query(
-                query_text, max_results=max(k_values)
-            )
-
-            # Calculate metrics for each K
-            for k in k_values:
-                recall = self.calculate_recall_at_k(query_id, predictions, k)
-                precision = self.calculate_precision_at_k(query_id, predictions, k)
-                ndcg = self.calculate_ndcg_at_k(query_id, predictions, k)
+            predictions = query_processor.process_query(query_text, max_results=max_k)
 
-                results["recall"][k].append(recall)
-                results["precision"][k].append(precision)
-                results["ndcg"][k].append(ndcg)
+            # Calculate all three metrics in one fused pass per query
+            scores = self.score_query(query_id, predictions, k_values)
+            for ki, k in enumerate(k_values):
+                recall[qi, ki], precision[qi, ki], ndcg[qi, ki] = (
+                    scores[k] if scores else (0.0, 0.0, 0.0)
+                )
 
         # Calculate average metrics
         avg_results = {
-            "recall": {k: np.mean(values) for k, values in results["recall"].items()},
-            "precision": {
-                k: np.mean(values) for k, values in results["precision"].items()
-            },
-            "ndcg": {k: np.mean(values) for k, values in results["ndcg"].items()},
+            "recall": dict(zip(k_values, recall.mean(axis=0))),
+            "precision": dict(zip(k_values, precision.mean(axis=0))),
+            "ndcg": dict(zip(k_values, ndcg.mean(axis=0))),
         }
 
         return avg_results
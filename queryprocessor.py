@@ -1,68 +1,211 @@
 # query_processor.py
 import re
+import threading
+from collections import deque
 from typing import Dict, List, Tuple, Any
 import json
+import numba
+import numpy as np
+import orjson
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Skills/technologies recognized in queries and assessment text
+TECH_SKILLS = [
+    "java",
+    "python",
+    "javascript",
+    "js",
+    "sql",
+    "react",
+    "angular",
+    "node",
+    "c++",
+    "c#",
+]
+
+# Test-type keywords recognized in queries and assessment text
+TEST_TYPES = [
+    "cognitive",
+    "personality",
+    "behavior",
+    "situational",
+    "technical",
+    "coding",
+]
+
+# All patterns are compiled once at import time; re.I replaces the
+# per-call query.lower() the previous inline patterns relied on
+_TIME_RE = re.compile(r"(\d+)\s*minutes")
+_MAX_TIME_RE = re.compile(
+    r"(less than|max|maximum|under|within|up to)\s*(\d+)\s*min", re.I
+)
+_TYPE_RES = {t_type: re.compile(rf"\b{t_type}\b", re.I) for t_type in TEST_TYPES}
+
+# Single alternations so the query is scanned once for all skills/types
+# instead of once per keyword
+_SKILL_ALT = re.compile(
+    r"\b(" + "|".join(re.escape(skill) for skill in TECH_SKILLS) + r")\b", re.I
+)
+_TYPE_ALT = re.compile(r"\b(" + "|".join(TEST_TYPES) + r")\b", re.I)
+
+def _has_word(text: str, needle: str) -> bool:
+    """True if needle occurs in text bounded by non-alphanumerics.
+
+    Works for any needle, including "c++"/"c#", which regex \\b anchors
+    can never match at the trailing non-word character; every skill path
+    (index build, automaton, direct scan) uses this boundary test.
+    """
+    start = 0
+    while (i := text.find(needle, start)) != -1:
+        end = i + len(needle)
+        if (i == 0 or not text[i - 1].isalnum()) and (
+            end == len(text) or not text[end].isalnum()
+        ):
+            return True
+        start = i + 1
+    return False
+
+
+# Inverted skill/type token index written by the scraper next to the catalog
+TOKEN_INDEX_PATH = "shl_catalog.index.json"
+
+
+def _load_token_index(path: str = TOKEN_INDEX_PATH):
+    """Load the scrape-time token index as frozensets, or None if absent.
+
+    Maps each skill/type token to the set of catalog indices whose text
+    mentions it, so filtering needs no per-query text scan.
+    """
+    try:
+        with open(path, "rb") as f:
+            raw = orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    return {
+        section: {
+            token: frozenset(ids) for token, ids in raw.get(section, {}).items()
+        }
+        for section in ("skills", "test_types")
+    }
+
+
+# Semantic result cache: near-duplicate queries ("Java test under 30 min"
+# vs "Java assessment in 30 minutes") reuse cached results when their
+# embeddings are close enough and they extract the same constraints
+CACHE_SIZE = 256
+CACHE_THRESHOLD = 0.95
+
+
+@numba.njit(cache=True)
+def _composite_scores(
+    base_scores: np.ndarray,
+    durations: np.ndarray,
+    skill_hits: np.ndarray,
+    max_duration: int,
+) -> np.ndarray:
+    """Combine semantic rank with constraint-fit adjustments per result.
+
+    Pure numeric loop (regex and dict access stay outside): each result
+    gets a small bonus per matched skill and a penalty when its duration
+    exceeds the requested maximum, on top of its rank-derived base score.
+    """
+    out = np.empty(base_scores.shape[0], np.float32)
+    for i in range(base_scores.shape[0]):
+        score = base_scores[i] + 0.05 * skill_hits[i]
+        if max_duration > 0 and durations[i] > max_duration:
+            score -= 0.1
+        out[i] = score
+    return out
+
+
+def _build_automaton(needles: List[str]):
+    """Build an Aho-Corasick automaton over the given lowercase needles."""
+    automaton = ahocorasick.Automaton()
+    for needle in needles:
+        automaton.add_word(needle, needle)
+    automaton.make_automaton()
+    return automaton
+
+
+def _automaton_matches(automaton, text: str) -> bool:
+    """True if any needle occurs in text on word boundaries.
+
+    The automaton scans the text once for all needles; the boundary check
+    on the adjacent characters replaces the \\b anchors of the regex path.
+    """
+    for end, needle in automaton.iter(text):
+        start = end - len(needle) + 1
+        if (start == 0 or not text[start - 1].isalnum()) and (
+            end + 1 == len(text) or not text[end + 1].isalnum()
+        ):
+            return True
+    return False
 
 
 class QueryProcessor:
     def __init__(self, embedding_engine):
         self.embedding_engine = embedding_engine
+        # (query embedding, constraints, results); oldest entries fall off.
+        # process_query runs on worker threads (asyncio.to_thread), so all
+        # cache reads and writes go through the lock.
+        self._cache = deque(maxlen=CACHE_SIZE)
+        self._cache_lock = threading.Lock()
+        # Prebuilt skill/type index from the scraper; None before the first
+        # scrape, in which case filtering falls back to scanning text
+        self.token_index = _load_token_index()
+
+    def _cache_lookup(
+        self, query_vec: np.ndarray, constraints: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Return cached results for a near-duplicate query, or None.
+
+        All cached embeddings are compared in one matmul over the
+        L2-normalized vectors; a hit also requires identical extracted
+        constraints so hard filters are never served from a near-miss.
+        """
+        with self._cache_lock:
+            if not self._cache:
+                return None
+
+            sims = np.stack([entry[0] for entry in self._cache]) @ query_vec
+            best = int(np.argmax(sims))
+            entry = self._cache[best]
+            if sims[best] >= CACHE_THRESHOLD and entry[1] == constraints:
+                # Refresh recency so the hit survives eviction
+                del self._cache[best]
+                self._cache.append(entry)
+                return entry[2]
+            return None
 
     def extract_constraints(self, query: str) -> Dict[str, Any]:
         """Extract constraints like time limits and skills from the query."""
         constraints = {}
 
-        # Extract time constraints
-        time_pattern = r"(\d+)\s*minutes"
-        max_time_pattern = r"(less than|max|maximum|under|within|up to)\s*(\d+)\s*min"
-
         # Check for maximum time constraints
-        max_time_match = re.search(max_time_pattern, query.lower())
+        max_time_match = _MAX_TIME_RE.search(query)
         if max_time_match:
             constraints["max_duration"] = int(max_time_match.group(2))
 
         # Check for exact time constraints
-        time_match = re.search(time_pattern, query)
+        time_match = _TIME_RE.search(query)
         if time_match and not max_time_match:
             constraints["duration"] = int(time_match.group(1))
 
-        # Extract skills/technologies
-        tech_skills = [
-            "java",
-            "python",
-            "javascript",
-            "js",
-            "sql",
-            "react",
-            "angular",
-            "node",
-            "c\+\+",
-            "c#",
-        ]
-        found_skills = []
-
-        for skill in tech_skills:
-            if re.search(rf"\b{skill}\b", query.lower()):
-                found_skills.append(skill)
-
+        # Extract skills/technologies in one scan, deduplicated in order
+        found_skills = list(
+            dict.fromkeys(match.lower() for match in _SKILL_ALT.findall(query))
+        )
         if found_skills:
             constraints["skills"] = found_skills
 
-        # Extract test types
-        test_types = [
-            "cognitive",
-            "personality",
-            "behavior",
-            "situational",
-            "technical",
-            "coding",
-        ]
-        found_types = []
-
-        for test_type in test_types:
-            if re.search(rf"\b{test_type}\b", query.lower()):
-                found_types.append(test_type)
-
+        # Extract test types in one scan, deduplicated in order
+        found_types = list(
+            dict.fromkeys(match.lower() for match in _TYPE_ALT.findall(query))
+        )
         if found_types:
             constraints["test_types"] = found_types
 
@@ -71,80 +214,175 @@ class QueryProcessor:
     def filter_assessments(
         self, assessments: List[Dict[str, Any]], constraints: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
-        """Filter assessments based on extracted constraints."""
-        filtered = assessments.copy()
-
-        # Filter by duration if specified
-        if "max_duration" in constraints:
-            filtered = [
-                a
-                for a in filtered
-                if "duration" in a
-                and re.search(r"(\d+)", a["duration"])
-                and int(re.search(r"(\d+)", a["duration"]).group(1))
-                <= constraints["max_duration"]
-            ]
-        elif "duration" in constraints:
-            filtered = [
-                a
-                for a in filtered
-                if "duration" in a
-                and re.search(r"(\d+)", a["duration"])
-                and int(re.search(r"(\d+)", a["duration"]).group(1))
-                == constraints["duration"]
-            ]
-
-        # Filter by skills if specified
-        if "skills" in constraints and constraints["skills"]:
-            skill_matches = []
-            for assessment in filtered:
-                # Check if any skill is mentioned in the assessment name or description
-                for skill in constraints["skills"]:
-                    if re.search(
-                        rf"\b{skill}\b", assessment.get("name", "").lower()
-                    ) or re.search(
-                        rf"\b{skill}\b", assessment.get("description", "").lower()
-                    ):
-                        skill_matches.append(assessment)
-                        break
-
-            if skill_matches:
-                filtered = skill_matches
-
-        # Filter by test types if specified
-        if "test_types" in constraints and constraints["test_types"]:
-            type_matches = []
-            for assessment in filtered:
-                # Check if any test type is mentioned in the assessment type or description
-                test_type = assessment.get("test_type", "").lower()
-                for t_type in constraints["test_types"]:
-                    if t_type in test_type or re.search(
-                        rf"\b{t_type}\b", assessment.get("description", "").lower()
-                    ):
-                        type_matches.append(assessment)
-                        break
-
-            if type_matches:
-                filtered = type_matches
-
-        return filtered
-
-    def process_query(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
-        """Process a query to return recommended assessments."""
+        """Filter assessments based on extracted constraints.
+
+        When the scrape-time token index is available, the skill/type
+        predicates reduce to set-membership checks on each record's catalog
+        index. All active predicates are evaluated in one pass over the list; the
+        original fallback behavior (the skill/type filters are skipped when
+        they would eliminate every remaining assessment) is preserved by
+        refining the recorded booleans afterwards, without rescanning text.
+        """
+        max_duration = constraints.get("max_duration")
+        duration = constraints.get("duration")
+        skills = constraints.get("skills")
+        test_types = constraints.get("test_types")
+
+        # Prebuilt index sets when available; records are looked up by their
+        # catalog index instead of scanning their text
+        skill_sets = self.token_index["skills"] if self.token_index else None
+        type_sets = self.token_index["test_types"] if self.token_index else None
+
+        automaton = (
+            _build_automaton(skills)
+            if skills and ahocorasick and skill_sets is None
+            else None
+        )
+
+        # Duration filtering is a vectorized comparison over the cached
+        # integer durations (-1 marks records without one)
+        dur_mask = None
+        if max_duration is not None or duration is not None:
+            dur_array = np.array(
+                [
+                    a["_duration_int"] if a.get("_duration_int") is not None else -1
+                    for a in assessments
+                ],
+                dtype=np.int32,
+            )
+            if max_duration is not None:
+                dur_mask = (dur_array != -1) & (dur_array <= max_duration)
+            else:
+                dur_mask = dur_array == duration
+
+        # Single pass: (assessment, passes_skill, passes_type)
+        rows = []
+        for assessment in assessments:
+            # Check if any skill is mentioned in the assessment name or description
+            passes_skill = True
+            if skills:
+                name_lc = assessment.get("_name_lc", "")
+                desc_lc = assessment.get("_desc_lc", "")
+                idx = assessment.get("_idx")
+                if skill_sets is not None and idx is not None:
+                    passes_skill = any(
+                        idx in skill_sets.get(skill, ()) for skill in skills
+                    )
+                elif automaton is not None:
+                    passes_skill = _automaton_matches(
+                        automaton, name_lc
+                    ) or _automaton_matches(automaton, desc_lc)
+                else:
+                    passes_skill = any(
+                        _has_word(name_lc, skill) or _has_word(desc_lc, skill)
+                        for skill in skills
+                    )
+
+            # Check if any test type is mentioned in the assessment type or description
+            passes_type = True
+            if test_types:
+                idx = assessment.get("_idx")
+                if type_sets is not None and idx is not None:
+                    passes_type = any(
+                        idx in type_sets.get(t_type, ()) for t_type in test_types
+                    )
+                else:
+                    type_lc = assessment.get("_type_lc", "")
+                    desc_lc = assessment.get("_desc_lc", "")
+                    passes_type = any(
+                        t_type in type_lc or _TYPE_RES[t_type].search(desc_lc)
+                        for t_type in test_types
+                    )
+
+            rows.append((assessment, passes_skill, passes_type))
+
+        # The duration constraint is strict; skill/type fall back to the
+        # previous stage when nothing survives them (as before)
+        if dur_mask is not None:
+            stage = [row for row, keep in zip(rows, dur_mask) if keep]
+        else:
+            stage = rows
+        if skills:
+            hits = [row for row in stage if row[1]]
+            if hits:
+                stage = hits
+        if test_types:
+            hits = [row for row in stage if row[2]]
+            if hits:
+                stage = hits
+
+        return [row[0] for row in stage]
+
+    def _rank_results(
+        self, results: List[Dict[str, Any]], constraints: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Order results by semantic rank plus constraint-fit tie-breaks."""
+        if len(results) <= 1:
+            return results
+
+        n = len(results)
+        # Descending base score from the ANN rank; adjustments are small so
+        # they act as tie-breaks rather than overriding semantic order
+        base = 1.0 - np.arange(n, dtype=np.float32) / n
+        durations = np.array(
+            [
+                r["_duration_int"] if r.get("_duration_int") is not None else -1
+                for r in results
+            ],
+            np.int32,
+        )
+        skills = constraints.get("skills") or []
+        skill_hits = np.array(
+            [
+                sum(
+                    1
+                    for skill in skills
+                    if _has_word(r.get("_name_lc", ""), skill)
+                    or _has_word(r.get("_desc_lc", ""), skill)
+                )
+                for r in results
+            ],
+            np.int32,
+        )
+        max_duration = constraints.get("max_duration") or -1
+
+        scores = _composite_scores(base, durations, skill_hits, max_duration)
+        order = np.argsort(-scores, kind="stable")
+        return [results[i] for i in order]
+
+    def process_query(
+        self, query: str, max_results: int = 10, query_vec=None
+    ) -> List[Dict[str, Any]]:
+        """Process a query to return recommended assessments.
+
+        query_vec optionally carries a precomputed query embedding so callers
+        that already embedded the query (e.g. the API's semantic cache) don't
+        pay for a second encode.
+        """
         # 1. Extract constraints from the query
         constraints = self.extract_constraints(query)
 
-        # 2. Perform semantic search
+        # 2. Check the semantic cache; a hit skips both the ANN search and
+        # the filter pass
+        if query_vec is None:
+            query_vec = self.embedding_engine.embed_query(query)
+        cached = self._cache_lookup(query_vec, constraints)
+        if cached is not None:
+            return cached[:max_results]
+
+        # 3. Perform semantic search
         search_results = self.embedding_engine.search(
-            query, n_results=20
+            query, n_results=20, query_vec=query_vec
         )  # Get more results for filtering
 
-        # 3. Apply constraint-based filtering
+        # 4. Apply constraint-based filtering
         filtered_results = self.filter_assessments(search_results, constraints)
 
-        # 4. Return top results (limited by max_results)
-        return (
-            filtered_results[:max_results]
-            if filtered_results
-            else search_results[:max_results]
-        )
+        # 5. Rank by semantic order with constraint-fit tie-breaks, then
+        # cache and return top results (limited by max_results)
+        results = self._rank_results(
+            filtered_results if filtered_results else search_results, constraints
+        )[:max_results]
+        with self._cache_lock:
+            self._cache.append((query_vec, constraints, results))
+        return results
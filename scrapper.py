@@ -2,10 +2,73 @@
 
 import requests
 from bs4 import BeautifulSoup
-import json
+import soupsieve
+import orjson
 import os
 import re
 
+# Prefer the lxml backend (C parser, 5-20x faster on large pages) and fall
+# back to the stdlib parser when lxml isn't installed
+try:
+    import lxml  # noqa: F401
+
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+_DIGIT_RE = re.compile(r"(\d+)")
+
+
+def _add_derived_fields(assessments):
+    """Cache lowercase text and the parsed duration on each assessment.
+
+    Query-time filtering repeatedly lowercased names/descriptions and
+    re-parsed the duration digits; doing it once at load time amortizes
+    that work across all queries.
+    """
+    for idx, assessment in enumerate(assessments):
+        assessment["_idx"] = idx
+        assessment["_name_lc"] = assessment.get("name", "").lower()
+        assessment["_desc_lc"] = assessment.get("description", "").lower()
+        assessment["_type_lc"] = assessment.get("test_type", "").lower()
+        assessment["_duration_int"] = (
+            int(match.group(1))
+            if (match := _DIGIT_RE.search(assessment.get("duration") or ""))
+            else None
+        )
+    return assessments
+
+
+def _build_token_index(assessments):
+    """Map each known skill/type token to the catalog indices that match it.
+
+    Scanning every record once per token here turns the query-time
+    skill/type predicates into set-membership lookups.
+    """
+    from queryprocessor import TECH_SKILLS, TEST_TYPES, _TYPE_RES, _has_word
+
+    # _has_word applies the same isalnum boundary test as the runtime
+    # Aho-Corasick path, so index lookups and text scans agree — the \b
+    # regexes would never match trailing "c++"/"c#"
+    skill_index = {}
+    for skill in TECH_SKILLS:
+        skill_index[skill] = [
+            i
+            for i, a in enumerate(assessments)
+            if _has_word(a["_name_lc"], skill) or _has_word(a["_desc_lc"], skill)
+        ]
+
+    type_index = {}
+    for t_type in TEST_TYPES:
+        pattern = _TYPE_RES[t_type]
+        type_index[t_type] = [
+            i
+            for i, a in enumerate(assessments)
+            if t_type in a["_type_lc"] or pattern.search(a["_desc_lc"])
+        ]
+
+    return {"skills": skill_index, "test_types": type_index}
+
 
 class SHLScraper:
     def __init__(self):
@@ -14,35 +77,106 @@ class SHLScraper:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
         self.data_path = "shl_catalog.json"
+        self.meta_path = "shl_catalog.meta.json"
+        self.index_path = "shl_catalog.index.json"
+
+        # Pooled session: keep-alive connection reuse plus negotiated
+        # compression instead of a cold TCP+TLS handshake per request
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount(
+            "https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        )
+
+        # One pass of this master pattern over each feature line tags every
+        # category of interest, replacing four separate substring scans plus
+        # the nested test-type guessing loops
+        self._feat_re = re.compile(
+            r"(?P<remote>remote testing|remote|online testing)"
+            r"|(?P<adaptive>adaptive|irt|item response)"
+            r"|(?P<dur>duration|time|minutes)"
+            r"|(?P<type>type|category|assessment type)"
+            r"|(?P<cog>cognitive|aptitude|reasoning|ability)"
+            r"|(?P<pers>personality|behavior|trait)"
+            r"|(?P<code>coding|technical|programming)"
+            r"|(?P<sit>situation|judgment|skills)"
+        )
+        self._yes_re = re.compile(r"yes|available|supported")
+
+        # Name/description selectors in priority order. The union string
+        # drives one DOM traversal; the precompiled individual patterns then
+        # resolve which selector each candidate belongs to, preserving the
+        # original first-selector-wins semantics.
+        name_selectors = [
+            ".product-name",
+            ".title",
+            "h2",
+            "h3",
+            ".card-title",
+            "strong",
+            ".assessment-title",
+        ]
+        self._name_union = ", ".join(name_selectors)
+        self._name_patterns = [soupsieve.compile(s) for s in name_selectors]
+        desc_selectors = [
+            ".product-description",
+            ".description",
+            ".card-text",
+            "p",
+            ".summary",
+            ".assessment-desc",
+        ]
+        self._desc_union = ", ".join(desc_selectors)
+        self._desc_patterns = [soupsieve.compile(s) for s in desc_selectors]
+        # Keyword-based type guesses, in precedence order: when a line
+        # mentions several categories, the first listed here wins
+        self._type_guesses = (
+            ("cog", "Cognitive Ability"),
+            ("pers", "Personality & Behavior"),
+            ("code", "Coding & Technical"),
+            ("sit", "Situational & Skills"),
+        )
+        self._dur_val_re = re.compile(r"(\d+\s*(minutes|min|m|hours|hr))")
+        self._type_val_re = re.compile(r"(?:type|category):\s*([^,\.]+)")
 
     def scrape_catalog(self):
         print("Scraping SHL product catalog...")
-        response = requests.get(self.url, headers=self.headers)
+
+        # Conditional GET: send the validators from the previous scrape so an
+        # unchanged page comes back as a bodyless 304
+        request_headers = {}
+        if os.path.exists(self.meta_path) and os.path.exists(self.data_path):
+            with open(self.meta_path, "rb") as f:
+                meta = orjson.loads(f.read())
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self.session.get(self.url, headers=request_headers)
+
+        if response.status_code == 304:
+            print("Catalog unchanged upstream (304), using cached copy")
+            return self.load_data()
 
         if response.status_code != 200:
             raise Exception(
                 f"Failed to fetch catalog page. Status code: {response.status_code}"
             )
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        assessments = []
-
-        selectors_to_try = [
-            ".product-item",
-            ".assessment-card",
-            ".product-card",
-            ".catalog-item",
-            ".test-product",
-            ".assessment-item",
-            'div[data-product-type="assessment"]',
-        ]
+        # Bytes input lets the parser handle encoding detection itself
+        soup = BeautifulSoup(response.content, HTML_PARSER)
 
-        assessment_elements = []
-        for selector in selectors_to_try:
-            assessment_elements = soup.select(selector)
-            if assessment_elements:
-                print(f"Found assessment elements using selector: {selector}")
-                break
+        # Union selector: one DOM traversal finds matches for every candidate
+        # selector instead of walking the tree once per selector
+        container_selector = (
+            ".product-item, .assessment-card, .product-card, .catalog-item, "
+            '.test-product, .assessment-item, div[data-product-type="assessment"]'
+        )
+
+        assessment_elements = soup.select(container_selector)
+        if assessment_elements:
+            print(f"Found {len(assessment_elements)} assessment elements")
 
         if not assessment_elements:
             print("Attempting fallback extraction based on page layout...")
@@ -66,145 +200,11 @@ class SHLScraper:
                 if assessment_elements:
                     break
 
-        for element in assessment_elements:
-            assessment = {
-                "name": None,
-                "url": None,
-                "description": None,
-                "remote_testing": "Unknown",
-                "adaptive_irt": "Unknown",
-                "duration": "Unknown",
-                "test_type": "Unknown",
-            }
-
-            # Extract name
-            for selector in [
-                ".product-name",
-                ".title",
-                "h2",
-                "h3",
-                ".card-title",
-                "strong",
-                ".assessment-title",
-            ]:
-                name_element = element.select_one(selector)
-                if name_element and name_element.text.strip():
-                    assessment["name"] = name_element.text.strip()
-                    break
-
-            # Extract URL
-            link_element = element.select_one("a[href]")
-            if link_element and link_element.get("href"):
-                href = link_element["href"]
-                base_url = "/".join(self.url.split("/")[:3])
-                assessment["url"] = (
-                    href
-                    if href.startswith("http")
-                    else f"{base_url}/{href.lstrip('/')}"
-                )
-
-            # Extract description
-            for selector in [
-                ".product-description",
-                ".description",
-                ".card-text",
-                "p",
-                ".summary",
-                ".assessment-desc",
-            ]:
-                desc_elements = element.select(selector)
-                if desc_elements:
-                    texts = [
-                        desc.text.strip() for desc in desc_elements if desc.text.strip()
-                    ]
-                    assessment["description"] = " ".join(texts)
-                    break
-
-            # Extract features
-            for selector in [
-                ".product-features li",
-                ".details li",
-                ".features li",
-                ".specs li",
-                "ul li",
-                "dl dt, dl dd",
-            ]:
-                features = element.select(selector)
-                if features:
-                    for feature in features:
-                        text = feature.text.strip().lower()
-
-                        if any(
-                            term in text
-                            for term in ["remote testing", "remote", "online testing"]
-                        ):
-                            assessment["remote_testing"] = (
-                                "Yes"
-                                if any(
-                                    term in text
-                                    for term in ["yes", "available", "supported"]
-                                )
-                                else "No"
-                            )
-                        if any(
-                            term in text
-                            for term in ["adaptive", "irt", "item response"]
-                        ):
-                            assessment["adaptive_irt"] = (
-                                "Yes"
-                                if any(
-                                    term in text
-                                    for term in ["yes", "available", "supported"]
-                                )
-                                else "No"
-                            )
-                        if any(
-                            term in text for term in ["duration", "time", "minutes"]
-                        ):
-                            match = re.search(r"(\d+\s*(minutes|min|m|hours|hr))", text)
-                            if match:
-                                assessment["duration"] = match.group(1)
-                        if any(
-                            term in text
-                            for term in ["type", "category", "assessment type"]
-                        ):
-                            match = re.search(r"(?:type|category):\s*([^,\.]+)", text)
-                            if match:
-                                assessment["test_type"] = match.group(1).strip()
-                        else:
-                            # Guess type if not explicitly found
-                            if any(
-                                term in text
-                                for term in [
-                                    "cognitive",
-                                    "aptitude",
-                                    "reasoning",
-                                    "ability",
-                                ]
-                            ):
-                                assessment["test_type"] = "Cognitive Ability"
-                            elif any(
-                                term in text
-                                for term in ["personality", "behavior", "trait"]
-                            ):
-                                assessment["test_type"] = "Personality & Behavior"
-                            elif any(
-                                term in text
-                                for term in ["coding", "technical", "programming"]
-                            ):
-                                assessment["test_type"] = "Coding & Technical"
-                            elif any(
-                                term in text
-                                for term in ["situation", "judgment", "skills"]
-                            ):
-                                assessment["test_type"] = "Situational & Skills"
-
-                    break  # Exit after first matching feature list
-
-            if assessment["name"] and assessment["description"]:
-                assessments.append(assessment)
-            else:
-                print("Skipping incomplete assessment:", assessment)
+        assessments = [
+            assessment
+            for assessment in map(self._extract_one, assessment_elements)
+            if assessment is not None
+        ]
 
         # Save only if there’s something to save
         if assessments:
@@ -212,8 +212,27 @@ class SHLScraper:
             if dir_name:
                 os.makedirs(dir_name, exist_ok=True)
 
-            with open(self.data_path, "w", encoding="utf-8") as f:
-                json.dump(assessments, f, indent=2)
+            with open(self.data_path, "wb") as f:
+                f.write(orjson.dumps(assessments, option=orjson.OPT_INDENT_2))
+
+            # Persist the response validators for the next conditional GET
+            with open(self.meta_path, "wb") as f:
+                f.write(
+                    orjson.dumps(
+                        {
+                            "etag": response.headers.get("ETag"),
+                            "last_modified": response.headers.get("Last-Modified"),
+                        }
+                    )
+                )
+
+            # Inverted skill/type token index, persisted alongside the
+            # catalog (built after the dump so the derived fields added for
+            # matching don't leak into shl_catalog.json)
+            with open(self.index_path, "wb") as f:
+                f.write(
+                    orjson.dumps(_build_token_index(_add_derived_fields(assessments)))
+                )
 
             print(
                 f"Scraped {len(assessments)} assessments and saved to {self.data_path}"
@@ -223,10 +242,120 @@ class SHLScraper:
 
         return assessments
 
+    def _extract_one(self, element):
+        """Extract one assessment record from a catalog element, or None."""
+        assessment = {
+            "name": None,
+            "url": None,
+            "description": None,
+            "remote_testing": "Unknown",
+            "adaptive_irt": "Unknown",
+            "duration": "Unknown",
+            "test_type": "Unknown",
+        }
+
+        # Extract name: one traversal collects every candidate, then the
+        # first selector (in priority order) whose first match has text wins
+        name_candidates = element.select(self._name_union)
+        for pattern in self._name_patterns:
+            name_element = next(
+                (c for c in name_candidates if pattern.match(c)), None
+            )
+            if name_element and name_element.text.strip():
+                assessment["name"] = name_element.text.strip()
+                break
+
+        # Extract URL
+        link_element = element.select_one("a[href]")
+        if link_element and link_element.get("href"):
+            href = link_element["href"]
+            base_url = "/".join(self.url.split("/")[:3])
+            assessment["url"] = (
+                href
+                if href.startswith("http")
+                else f"{base_url}/{href.lstrip('/')}"
+            )
+
+        # Extract description: same single traversal, then only the nodes of
+        # the first matching selector are joined — taking the whole union
+        # would duplicate text when a container and its descendants both
+        # match (e.g. .product-description wrapping a p)
+        desc_candidates = element.select(self._desc_union)
+        for pattern in self._desc_patterns:
+            desc_elements = [
+                candidate
+                for candidate in desc_candidates
+                if pattern.match(candidate)
+            ]
+            if desc_elements:
+                texts = [
+                    desc.text.strip() for desc in desc_elements if desc.text.strip()
+                ]
+                assessment["description"] = " ".join(texts)
+                break
+
+        # Extract features
+        for selector in [
+            ".product-features li",
+            ".details li",
+            ".features li",
+            ".specs li",
+            "ul li",
+            "dl dt, dl dd",
+        ]:
+            features = element.select(selector)
+            if features:
+                for feature in features:
+                    text = feature.text.strip().lower()
+
+                    # Single scan over the line; dispatch on which
+                    # category matched
+                    explicit_type = False
+                    guessed = set()
+                    for match in self._feat_re.finditer(text):
+                        group = match.lastgroup
+                        if group == "remote":
+                            assessment["remote_testing"] = (
+                                "Yes" if self._yes_re.search(text) else "No"
+                            )
+                        elif group == "adaptive":
+                            assessment["adaptive_irt"] = (
+                                "Yes" if self._yes_re.search(text) else "No"
+                            )
+                        elif group == "dur":
+                            dur_match = self._dur_val_re.search(text)
+                            if dur_match:
+                                assessment["duration"] = dur_match.group(1)
+                        elif group == "type":
+                            explicit_type = True
+                            type_match = self._type_val_re.search(text)
+                            if type_match:
+                                assessment["test_type"] = type_match.group(1).strip()
+                        else:
+                            guessed.add(group)
+
+                    # Guess type only when not explicitly labelled, resolving
+                    # multiple matches by fixed precedence rather than by
+                    # position in the line
+                    if not explicit_type:
+                        for group, label in self._type_guesses:
+                            if group in guessed:
+                                assessment["test_type"] = label
+                                break
+
+                break  # Exit after first matching feature list
+
+        if assessment["name"] and assessment["description"]:
+            return assessment
+
+        print("Skipping incomplete assessment:", assessment)
+        return None
+
     def load_data(self):
         """Load from file or scrape if file does not exist."""
         if os.path.exists(self.data_path):
-            with open(self.data_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            # orjson parses the cached catalog in C from raw bytes
+            with open(self.data_path, "rb") as f:
+                return _add_derived_fields(orjson.loads(f.read()))
         else:
-            return self.scrape_catalog()
+            return _add_derived_fields(self.scrape_catalog())